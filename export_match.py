@@ -0,0 +1,289 @@
+import argparse
+import base64
+import glob
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Frames are rendered off-screen in every process
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import game
+
+try:
+    from PIL import Image
+    has_pillow = True
+except ImportError:
+    has_pillow = False
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+RECORDING_VERSION = 1 # Bump when the recording layout changes
+
+
+def record_match(seed, difficulty, fps):
+    # Fast-forward a seeded AI_VS_AI match, keeping the drawable state every few
+    # ticks. fps must divide SIM_TICKS_PER_SECOND so frames are evenly spaced.
+    game.game_mode = game.GameMode.AI_VS_AI
+    game.difficulty = difficulty
+    game.reset_game(seed)
+
+    ticks_per_frame = game.SIM_TICKS_PER_SECOND // fps
+    frames = []
+    while True:
+        if game.scheduler.now % ticks_per_frame == 0 or game.match_over:
+            frames.append(capture_frame())
+        if game.match_over:
+            break
+        game.step_simulation()
+    return {"version": RECORDING_VERSION, "grid_size": game.GRID_SIZE, "seed": seed, "difficulty": difficulty,
+            "fps": fps, "ticks_per_frame": ticks_per_frame, "frames": frames}
+
+
+def capture_frame():
+    # Plain JSON data only, with the board in the 2-bit snapshot encoding
+    return {
+        "tick": game.scheduler.now,
+        "board": base64.b64encode(game.pack_board(game.board)).decode("ascii"),
+        "positions": {agent: list(position) for agent, position in game.player_positions.items()},
+        "scores": dict(game.scores),
+        "power_ups": [[x, y, p_type.value] for x, y, p_type in game.power_ups],
+        "frozen_until": dict(game.frozen_until),
+    }
+
+
+def save_recording(recording, path):
+    with open(path, "w") as recording_file:
+        json.dump(recording, recording_file, separators=(",", ":"))
+
+
+def load_recording(path):
+    # Recordings are plain JSON, so loading one from someone else can't run code
+    with open(path) as recording_file:
+        recording = json.load(recording_file)
+    if recording.get("version") != RECORDING_VERSION:
+        raise ValueError(f"unsupported recording version {recording.get('version')!r}")
+    if recording["grid_size"] != game.GRID_SIZE:
+        raise ValueError(f"recorded on a {recording['grid_size']}x{recording['grid_size']} board")
+    if recording["difficulty"] not in game.AI_PROFILES:
+        raise ValueError(f"unknown difficulty {recording['difficulty']!r}")
+    ticks_per_frame = recording["ticks_per_frame"]
+    if not isinstance(ticks_per_frame, int) or ticks_per_frame < 1 or game.SIM_TICKS_PER_SECOND % ticks_per_frame:
+        raise ValueError(f"ticks_per_frame must divide {game.SIM_TICKS_PER_SECOND}, got {ticks_per_frame!r}")
+    return recording
+
+
+def render_frame(frame, difficulty):
+    game.board = game.unpack_board(base64.b64decode(frame["board"]), game.GRID_SIZE)
+    game.player_positions = {agent: tuple(position) for agent, position in frame["positions"].items()}
+    game.scores = frame["scores"]
+    game.power_ups = [(x, y, game.PowerUpType(p_type)) for x, y, p_type in frame["power_ups"]]
+    game.frozen_until = frame["frozen_until"]
+    game.scheduler = game.EventScheduler()
+    game.scheduler.now = frame["tick"]
+    game.game_mode = game.GameMode.AI_VS_AI
+    game.difficulty = difficulty
+
+    game.screen.fill(game.PINK_LIGHT)
+    game.draw_board()
+    game.draw_scores_and_timer(frame["tick"] // game.SIM_TICKS_PER_SECOND)
+
+
+def frame_path(directory, index, extension):
+    return os.path.join(directory, f"frame_{index:05d}.{extension}")
+
+
+def render_chunk(frames, first_index, difficulty, png_dir, gif_dir):
+    # Worker: render and encode a contiguous run of frames straight to disk, as
+    # PNG and/or a quantized single-frame GIF. Nothing but the count goes back
+    # to the parent.
+    for offset, frame in enumerate(frames):
+        render_frame(frame, difficulty)
+        if png_dir:
+            pygame.image.save(game.screen, frame_path(png_dir, first_index + offset, "png"))
+        if gif_dir:
+            image = Image.frombytes("RGB", game.screen.get_size(), pygame.image.tobytes(game.screen, "RGB"))
+            image.quantize().save(frame_path(gif_dir, first_index + offset, "gif"))
+    return len(frames)
+
+
+def read_png_chunks(path):
+    with open(path, "rb") as png_file:
+        data = png_file.read()
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        (length,) = struct.unpack_from(">I", data, offset)
+        chunk_type = data[offset + 4:offset + 8]
+        yield chunk_type, data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+
+def write_png_chunk(out, chunk_type, data):
+    out.write(struct.pack(">I", len(data)) + chunk_type + data)
+    out.write(struct.pack(">I", zlib.crc32(chunk_type + data)))
+
+
+def write_apng(png_paths, ticks_per_frame, animation_path):
+    # Re-wrap the workers' PNG frames as APNG frames one file at a time, so
+    # memory stays at one frame however long the clip is
+    with open(animation_path, "wb") as out:
+        out.write(PNG_SIGNATURE)
+        sequence = 0
+        header = None
+        for index, path in enumerate(png_paths):
+            chunks = list(read_png_chunks(path))
+            frame_header = next(data for chunk_type, data in chunks if chunk_type == b"IHDR")
+            if header is None:
+                header = frame_header
+                write_png_chunk(out, b"IHDR", header)
+                write_png_chunk(out, b"acTL", struct.pack(">II", len(png_paths), 0)) # 0 = loop forever
+            elif frame_header != header:
+                raise ValueError(f"{path} has a different size or pixel format from the first frame")
+
+            width, height = struct.unpack_from(">II", header)
+            write_png_chunk(out, b"fcTL", struct.pack(">IIIIIHHBB", sequence, width, height, 0, 0,
+                                                      ticks_per_frame, game.SIM_TICKS_PER_SECOND, 0, 0))
+            sequence += 1
+            for chunk_type, data in chunks:
+                if chunk_type != b"IDAT":
+                    continue
+                if index == 0:
+                    write_png_chunk(out, b"IDAT", data)
+                else:
+                    write_png_chunk(out, b"fdAT", struct.pack(">I", sequence) + data)
+                    sequence += 1
+        write_png_chunk(out, b"IEND", b"")
+
+
+def read_gif_frame(path):
+    # Returns (width, height, image block) for a single-frame GIF, with its
+    # global colour table moved into the image descriptor as a local one
+    with open(path, "rb") as gif_file:
+        data = gif_file.read()
+    width, height, packed = struct.unpack_from("<HHB", data, 6)
+    offset = 13
+    table_bits = packed & 0x07
+    color_table = b""
+    if packed & 0x80:
+        color_table = data[offset:offset + 3 * (2 << table_bits)]
+        offset += len(color_table)
+
+    while data[offset] == 0x21: # Skip Pillow's extensions; we write our own timing
+        offset += 2
+        while data[offset]:
+            offset += data[offset] + 1
+        offset += 1
+
+    descriptor = bytearray(data[offset:offset + 10])
+    image_data = data[offset + 10:-1] # Drop the trailer
+    if not descriptor[9] & 0x80:
+        descriptor[9] |= 0x80 | table_bits
+        image_data = color_table + image_data
+    return width, height, bytes(descriptor) + image_data
+
+
+def write_gif(gif_paths, ticks_per_frame, animation_path):
+    # Concatenate the workers' quantized frames into one looping GIF without
+    # decoding them. GIF delays are in centiseconds, so they are rounded
+    # cumulatively to keep the total running time exact.
+    centiseconds_per_frame = ticks_per_frame * 100 / game.SIM_TICKS_PER_SECOND
+    with open(animation_path, "wb") as out:
+        for index, path in enumerate(gif_paths):
+            width, height, image_block = read_gif_frame(path)
+            if index == 0:
+                out.write(b"GIF89a" + struct.pack("<HHBBB", width, height, 0x70, 0, 0))
+                out.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00") # Loop forever
+            delay = round((index + 1) * centiseconds_per_frame) - round(index * centiseconds_per_frame)
+            out.write(b"\x21\xf9\x04\x04" + struct.pack("<H", delay) + b"\x00\x00")
+            out.write(image_block)
+        out.write(b"\x3b")
+
+
+def export(recording, frames_dir, animation_path, workers):
+    frames = recording["frames"]
+    ticks_per_frame = recording["ticks_per_frame"]
+    animation_format = os.path.splitext(animation_path)[1].lower().lstrip(".") if animation_path else None
+    if frames_dir:
+        os.makedirs(frames_dir, exist_ok=True)
+        for stale_frame in glob.glob(os.path.join(frames_dir, "frame_*.png")):
+            os.remove(stale_frame) # Left over from an earlier, longer export
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        png_dir = frames_dir or (temp_dir if animation_format == "png" else None)
+        gif_dir = temp_dir if animation_format == "gif" else None
+
+        workers = workers or os.cpu_count() or 1
+        chunk_size = max(1, -(-len(frames) // workers))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(render_chunk, frames[start:start + chunk_size], start,
+                                   recording["difficulty"], png_dir, gif_dir)
+                       for start in range(0, len(frames), chunk_size)]
+            for future in futures:
+                future.result()
+
+        if animation_format == "png":
+            write_apng([frame_path(png_dir, i, "png") for i in range(len(frames))], ticks_per_frame, animation_path)
+        elif animation_format == "gif":
+            write_gif([frame_path(gif_dir, i, "gif") for i in range(len(frames))], ticks_per_frame, animation_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render an AI vs AI match to an image sequence or animation without a window.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--seed", type=int, default=0, help="simulate a fresh match with this seed")
+    source.add_argument("--recording", help="render a match saved earlier with --save-recording")
+    parser.add_argument("--difficulty", choices=["normal", "hard"], help="default: normal; taken from the recording with --recording")
+    parser.add_argument("--fps", type=int, help="frames per second of match time (default: 15); taken from the recording with --recording")
+    parser.add_argument("--save-recording", help="also save the recorded match to this file")
+    parser.add_argument("--frames-dir", help="write one PNG per frame into this directory")
+    parser.add_argument("--animation", help="write an animated .gif (needs Pillow) or .png")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: all cores)")
+    args = parser.parse_args()
+
+    if not (args.frames_dir or args.animation or args.save_recording):
+        parser.error("nothing to do: pass --frames-dir, --animation and/or --save-recording")
+    animation_extension = os.path.splitext(args.animation)[1].lower() if args.animation else None
+    if animation_extension not in (None, ".gif", ".png"):
+        parser.error("--animation must end in .gif or .png")
+    if animation_extension == ".gif" and not has_pillow:
+        parser.error("GIF export needs Pillow (pip install pillow)")
+
+    if args.recording:
+        if args.fps is not None or args.difficulty is not None:
+            parser.error("--fps and --difficulty come from the recording and can't be combined with --recording")
+        try:
+            recording = load_recording(args.recording)
+        except KeyError as e:
+            parser.error(f"can't read recording {args.recording}: missing {e}")
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            parser.error(f"can't read recording {args.recording}: {e}")
+        ticks_per_frame = recording["ticks_per_frame"]
+    else:
+        args.fps = args.fps or 15
+        if not 1 <= args.fps <= game.SIM_TICKS_PER_SECOND or game.SIM_TICKS_PER_SECOND % args.fps:
+            parser.error(f"--fps must divide {game.SIM_TICKS_PER_SECOND}, e.g. 10, 15, 20, 30 or 60")
+        ticks_per_frame = game.SIM_TICKS_PER_SECOND // args.fps
+    if animation_extension == ".gif" and ticks_per_frame < 2:
+        parser.error(f"GIF frame delays are whole centiseconds and viewers slow down anything under 2, so "
+                     f"{game.SIM_TICKS_PER_SECOND // ticks_per_frame} fps is too fast; record at 30 fps or less")
+
+    start = time.time()
+    if not args.recording:
+        recording = record_match(args.seed, args.difficulty or "normal", args.fps)
+    if args.save_recording:
+        save_recording(recording, args.save_recording)
+
+    if args.frames_dir or args.animation:
+        export(recording, args.frames_dir, args.animation, args.workers)
+    print(f"Exported {len(recording['frames'])} frames in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
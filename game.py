@@ -2,9 +2,18 @@ import pygame
 import random
 import sys
 import math
+import heapq
+import struct
+from itertools import chain
+from collections import deque
+import json
+import time
+import argparse
 from enum import Enum
 import os
 
+from telemetry import telemetry, start_metrics_server
+
 # Initialize pygame
 pygame.init()
 pygame.font.init()
@@ -29,6 +38,14 @@ class PowerUpType(Enum):
     FREEZE = 1
     POINTS = 2
 
+# Timed events fired by the simulation scheduler
+class GameEvent(Enum):
+    SPAWN_POWER_UP = 1   # One-off respawn after a power-up is collected
+    PERIODIC_SPAWN = 2   # Recurring spawn every POWER_UP_SPAWN_INTERVAL seconds
+    UNFREEZE = 3         # Freeze effect on an agent runs out
+    AI_MOVE = 4          # An AI-controlled agent takes its next step
+    MATCH_END = 5        # TIME_LIMIT reached
+
 # Constants
 WIDTH, HEIGHT = 800, 600
 GRID_SIZE = 20
@@ -57,8 +74,35 @@ NORMAL_SPEED = 7
 HARD_SPEED = 12
 AI_NORMAL_SMARTNESS = 0.7 # Probability of making a smart move
 AI_HARD_SMARTNESS = 0.9
+AI_STEAL_WEIGHT = 1.5    # How much a smart AI prefers opponent cells over empty ones
+AI_FRONTIER_WEIGHT = 0.5 # How much a smart AI prefers cells bordering more unowned ground
 FREEZE_DURATION = 5  # Seconds to freeze opponent
 POINTS_BONUS = 20    # Points given by point power-up
+POWER_UP_RESPAWN_DELAY = 2   # Seconds after a pickup before a replacement spawns
+POWER_UP_SPAWN_INTERVAL = 5  # Seconds between periodic power-up spawns
+GAME_RULES_VERSION = 2 # Bump whenever a change makes the same seed play out differently
+
+# Simulation clock: the match advances in fixed ticks, independent of frame rate
+SIM_TICKS_PER_SECOND = 60
+SIM_TICK_MS = 1000 / SIM_TICKS_PER_SECOND
+MAX_SIM_STEPS_PER_FRAME = 5 # Catch-up limit so a long stall doesn't freeze the game
+
+# Human input
+DIRECTION_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+INPUT_REPEAT_DELAY_MS = 170    # Hold time before a direction key starts repeating
+INPUT_REPEAT_INTERVAL_MS = 100 # Time between repeated moves while held (0 disables auto-repeat)
+INPUT_BUFFER_SIZE = 4          # Presses queued beyond this are dropped
+
+# AI parameters per difficulty. tune_ai.py searches this space and writes
+# ai_presets.json, which replaces these defaults in AI_PROFILES when present.
+# DEFAULT_AI_PROFILES always keeps the built-in values.
+DEFAULT_AI_PROFILES = {
+    "normal": {"smartness": AI_NORMAL_SMARTNESS, "speed": NORMAL_SPEED,
+               "steal_weight": AI_STEAL_WEIGHT, "frontier_weight": AI_FRONTIER_WEIGHT},
+    "hard": {"smartness": AI_HARD_SMARTNESS, "speed": HARD_SPEED,
+             "steal_weight": AI_STEAL_WEIGHT, "frontier_weight": AI_FRONTIER_WEIGHT},
+}
+AI_PROFILES = {name: dict(profile) for name, profile in DEFAULT_AI_PROFILES.items()}
 
 # Initialize screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -72,10 +116,13 @@ player_positions = {"blue": (1, 1), "green": (GRID_SIZE-2, GRID_SIZE-2)}
 game_state = GameState.MENU
 game_mode = GameMode.HUMAN_VS_AI
 difficulty = "normal"
+ai_overrides = {} # agent -> AI profile used instead of the difficulty preset (self-play tuning)
+resume_requested = False # Load SAVE_FILE instead of starting fresh when PLAYING begins
 
 # Power-up variables
 power_ups = []  # Will store (x, y, type) tuples
-frozen_until = {"blue": 0, "green": 0}  # Timestamp when freeze effect ends
+frozen_until = {"blue": 0, "green": 0}  # Simulation tick when freeze effect ends (0 = not frozen)
+match_over = False
 
 # Customization options
 player_colors = {
@@ -88,6 +135,100 @@ custom_player_colors = {
 }
 available_colors = [PASTEL_BLUE, PASTEL_GREEN, PASTEL_YELLOW, PASTEL_PURPLE, HOT_PINK]
 
+
+class EventScheduler:
+    # Min-heap of (tick, seq, event, payload) on the simulation clock.
+    # seq keeps ordering stable for events due on the same tick, and each
+    # entry is popped exactly once when the clock reaches it.
+    def __init__(self):
+        self.now = 0
+        self.queue = []
+        self.seq = 0
+
+    def schedule(self, delay_ticks, event, payload=None):
+        heapq.heappush(self.queue, (self.now + max(1, int(delay_ticks)), self.seq, event, payload))
+        self.seq += 1
+
+    def advance(self):
+        # Move the clock forward one tick and hand back everything now due
+        self.now += 1
+        due = []
+        while self.queue and self.queue[0][0] <= self.now:
+            _, _, event, payload = heapq.heappop(self.queue)
+            due.append((event, payload))
+        return due
+
+
+scheduler = EventScheduler()
+
+
+class RngStreams:
+    # One random generator per purpose, owned by the session. Gameplay (power-up
+    # spawns) and AI draws are reseeded for every match, so a match is fully
+    # reproducible from its seed; cosmetic draws (menu backgrounds) have their
+    # own stream and can never shift a match's outcome.
+    def __init__(self, session_seed=None):
+        if session_seed is None:
+            session_seed = int.from_bytes(os.urandom(8), "little")
+        self.session_seed = session_seed
+        self.match_seeds = random.Random(f"{session_seed}:matches")
+        self.cosmetic = random.Random(f"{session_seed}:cosmetic")
+        self.gameplay = random.Random()
+        self.ai = random.Random()
+        self.match_seed = None
+
+    def seed_match(self, match_seed=None):
+        if match_seed is None:
+            match_seed = self.match_seeds.getrandbits(32)
+        self.match_seed = match_seed
+        self.gameplay.seed(f"{match_seed}:gameplay")
+        self.ai.seed(f"{match_seed}:ai")
+
+
+rng = RngStreams()
+
+
+class InputBuffer:
+    # Turns direction-key events into at most one human move per simulation
+    # tick. Presses are queued so quick taps survive a slow frame, and a held
+    # key repeats on the simulation clock after INPUT_REPEAT_DELAY_MS.
+    def __init__(self):
+        self.pending = deque() # (key, perf_counter time the press was queued by)
+        self.held = []         # Held direction keys, most recent last
+        self.next_repeat_tick = 0
+
+    def key_down(self, key, now_tick, pressed_at):
+        if key in self.held:
+            self.held.remove(key)
+        self.held.append(key)
+        if len(self.pending) < INPUT_BUFFER_SIZE:
+            self.pending.append((key, pressed_at))
+        self.next_repeat_tick = now_tick + ms_to_ticks(INPUT_REPEAT_DELAY_MS)
+
+    def key_up(self, key):
+        if key in self.held:
+            self.held.remove(key)
+
+    def next_move(self, now_tick):
+        # Returns (key, pressed_at) for this tick; pressed_at is None for auto-repeats
+        if self.pending:
+            return self.pending.popleft()
+        if self.held and INPUT_REPEAT_INTERVAL_MS > 0 and now_tick >= self.next_repeat_tick:
+            self.next_repeat_tick = now_tick + ms_to_ticks(INPUT_REPEAT_INTERVAL_MS)
+            return self.held[-1], None
+        return None
+
+    def clear(self):
+        self.pending.clear()
+        self.held = []
+
+
+def ms_to_ticks(ms):
+    return max(1, round(ms / SIM_TICK_MS))
+
+
+human_input = InputBuffer()
+
 # Fonts
 TITLE_FONT = pygame.font.Font(None, 64)
 MENU_FONT = pygame.font.Font(None, 40)
@@ -109,11 +250,21 @@ except Exception as e:
     print(f"Error loading music: {e}")
     has_music = False
 
+# Load tuned AI presets
+try:
+    presets_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_presets.json")
+    if os.path.exists(presets_path):
+        with open(presets_path) as presets_file:
+            for preset_name, preset in json.load(presets_file).items():
+                AI_PROFILES.setdefault(preset_name, {}).update(preset)
+except Exception as e:
+    print(f"Error loading AI presets: {e}")
+
 def spawn_power_up():
     if len(power_ups) < 3:
         for _ in range(10):
-            x = random.randint(0, GRID_SIZE - 1)
-            y = random.randint(0, GRID_SIZE - 1)
+            x = rng.gameplay.randint(0, GRID_SIZE - 1)
+            y = rng.gameplay.randint(0, GRID_SIZE - 1)
 
             if board[x][y] is None and (x, y) not in [pos[:2] for pos in power_ups]:
                 # Ensure power-ups don't spawn directly on players
@@ -121,9 +272,12 @@ def spawn_power_up():
                      # Check not too close to player current positions (more dynamic)
                     if (abs(x - player_positions["blue"][0]) > 2 or abs(y - player_positions["blue"][1]) > 2) and \
                        (abs(x - player_positions["green"][0]) > 2 or abs(y - player_positions["green"][1]) > 2):
-                        power_type = random.choice(list(PowerUpType))
+                        power_type = rng.gameplay.choice(list(PowerUpType))
                         power_ups.append((x, y, power_type))
+                        telemetry.count("power_ups_spawned")
                         break
+        else:
+            telemetry.count("power_up_spawn_failures") # No free cell found in 10 tries
 
 def draw_board():
     # Draw the game area background (sidebar will be drawn over screen.fill)
@@ -174,9 +328,8 @@ def draw_board():
     for player, pos in player_positions.items():
         x_player, y_player = pos
         center = (x_player * CELL_SIZE + CELL_SIZE // 2, y_player * CELL_SIZE + CELL_SIZE // 2)
-        current_time = pygame.time.get_ticks() / 1000
 
-        if frozen_until[player] > current_time:
+        if frozen_until[player]:
             pygame.draw.circle(game_area_surface, ICE_BLUE, center, CELL_SIZE // 2)
             pygame.draw.circle(game_area_surface, custom_player_colors[player], center, CELL_SIZE // 2 - 3)
             for i in range(4):
@@ -231,26 +384,24 @@ def draw_scores_and_timer(elapsed_time):
     points_text = GAME_FONT.render(f"+{POINTS_BONUS} points", True, BLACK)
     screen.blit(points_text, (sidebar_x_offset + 30, legend_y_start + 55))
 
-    current_time = pygame.time.get_ticks() / 1000
     frozen_text_y_offset = legend_y_start + 90 # Adjusted Y
 
-    if frozen_until["blue"] > current_time:
-        freeze_remain = math.ceil(frozen_until["blue"] - current_time) # Use ceil for display
+    if frozen_until["blue"]:
+        freeze_remain = math.ceil((frozen_until["blue"] - scheduler.now) / SIM_TICKS_PER_SECOND) # Use ceil for display
         freeze_msg = f"Blue frozen: {freeze_remain}s"
         freeze_surf = GAME_FONT.render(freeze_msg, True, ICE_BLUE)
         screen.blit(freeze_surf, (sidebar_x_offset, frozen_text_y_offset))
         frozen_text_y_offset += 30
 
-    if frozen_until["green"] > current_time:
-        freeze_remain = math.ceil(frozen_until["green"] - current_time) # Use ceil for display
+    if frozen_until["green"]:
+        freeze_remain = math.ceil((frozen_until["green"] - scheduler.now) / SIM_TICKS_PER_SECOND) # Use ceil for display
         freeze_msg = f"Green frozen: {freeze_remain}s"
         freeze_surf = GAME_FONT.render(freeze_msg, True, ICE_BLUE)
         screen.blit(freeze_surf, (sidebar_x_offset, frozen_text_y_offset))
 
 
 def move_agent(agent, human_input=None):
-    current_time = pygame.time.get_ticks() / 1000
-    if frozen_until[agent] > current_time:
+    if frozen_until[agent]: # Cleared by the UNFREEZE event
         return
 
     x, y = player_positions[agent]
@@ -281,7 +432,7 @@ def move_agent(agent, human_input=None):
         if not possible_moves:
             return
 
-        smartness = AI_HARD_SMARTNESS if difficulty == "hard" else AI_NORMAL_SMARTNESS
+        profile = ai_profile(agent)
         
         # AI prioritizes power-ups > uncaptured/opponent cells > own cells
         best_move = None
@@ -302,13 +453,14 @@ def move_agent(agent, human_input=None):
                     good_moves.append((p_x_check, p_y_check))
             
             if good_moves:
-                if random.random() < smartness: # Smart choice among good moves
-                    # Could add more logic here, e.g., move towards center, or cut off opponent
-                    best_move = random.choice(good_moves)
+                if rng.ai.random() < profile["smartness"]: # Smart choice among good moves
+                    move_values = [ai_move_value(agent, move, profile) for move in good_moves]
+                    top_value = max(move_values)
+                    best_move = rng.ai.choice([move for move, value in zip(good_moves, move_values) if value == top_value])
                 else: # Random choice among good moves
-                    best_move = random.choice(good_moves)
+                    best_move = rng.ai.choice(good_moves)
             else: # Only own cells are available
-                best_move = random.choice(possible_moves) if possible_moves else (x,y)
+                best_move = rng.ai.choice(possible_moves) if possible_moves else (x,y)
         
         new_x, new_y = best_move
         moved = True
@@ -337,21 +489,272 @@ def check_power_ups(agent, x, y):
         p_x, p_y, p_type = power_up_data
         if x == p_x and y == p_y:
             power_ups.remove(power_up_data) # Remove the collected power-up
+            telemetry.count("power_ups_collected")
             
             if p_type == PowerUpType.FREEZE:
                 opponent = "green" if agent == "blue" else "blue"
-                frozen_until[opponent] = pygame.time.get_ticks() / 1000 + FREEZE_DURATION
+                freeze_ticks = FREEZE_DURATION * SIM_TICKS_PER_SECOND
+                frozen_until[opponent] = scheduler.now + freeze_ticks
+                scheduler.schedule(freeze_ticks, GameEvent.UNFREEZE, opponent)
             elif p_type == PowerUpType.POINTS:
                 scores[agent] += POINTS_BONUS
             
-            # Spawn a new power-up (could be delayed if needed)
-            pygame.time.set_timer(pygame.USEREVENT + 1, 2000) # Timer to spawn new power-up after 2s
+            # Spawn a replacement power-up after a short delay
+            scheduler.schedule(POWER_UP_RESPAWN_DELAY * SIM_TICKS_PER_SECOND, GameEvent.SPAWN_POWER_UP)
             return # Assume only one power-up per cell
 
 
-def game_over_screen():
-    screen.fill(PINK_LIGHT)
+def ai_profile(agent):
+    return ai_overrides.get(agent) or AI_PROFILES[difficulty]
 
+
+def ai_move_value(agent, cell, profile):
+    # Stealing scores twice (our +1, their -1); cells next to unowned ground keep the AI expanding
+    x, y = cell
+    value = profile["steal_weight"] if board[x][y] is not None else 1.0
+    open_neighbours = 0
+    for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+        n_x, n_y = x + dx, y + dy
+        if 0 <= n_x < GRID_SIZE and 0 <= n_y < GRID_SIZE and board[n_x][n_y] != agent:
+            open_neighbours += 1
+    return value + profile["frontier_weight"] * open_neighbours
+
+
+def ai_move_delay_ticks(agent):
+    # Higher speed means fewer ticks between AI moves
+    return max(1, int(SIM_TICKS_PER_SECOND / ai_profile(agent)["speed"]))
+
+
+def handle_game_event(event, payload):
+    global match_over
+
+    if event == GameEvent.SPAWN_POWER_UP:
+        spawn_power_up()
+    elif event == GameEvent.PERIODIC_SPAWN:
+        spawn_power_up()
+        scheduler.schedule(POWER_UP_SPAWN_INTERVAL * SIM_TICKS_PER_SECOND, GameEvent.PERIODIC_SPAWN)
+    elif event == GameEvent.UNFREEZE:
+        # A newer freeze may have extended the deadline; only the latest expiry thaws
+        if frozen_until[payload] and frozen_until[payload] <= scheduler.now:
+            frozen_until[payload] = 0
+    elif event == GameEvent.AI_MOVE:
+        if not frozen_until[payload]: # A frozen agent skips its move, so there is no decision to time
+            decision_start = time.perf_counter()
+            move_agent(payload)
+            telemetry.observe("ai_decision", time.perf_counter() - decision_start)
+        scheduler.schedule(ai_move_delay_ticks(payload), GameEvent.AI_MOVE, payload)
+    elif event == GameEvent.MATCH_END:
+        match_over = True
+        telemetry.count("matches_played")
+
+
+# Globals that make up one running match. Capturing and restoring them lets
+# several independent matches (e.g. training environments) share this module.
+MATCH_STATE_NAMES = ("board", "scores", "player_positions", "power_ups", "frozen_until",
+                     "match_over", "scheduler", "game_mode", "difficulty", "ai_overrides", "rng")
+
+
+def capture_match_state():
+    return {name: globals()[name] for name in MATCH_STATE_NAMES}
+
+
+def restore_match_state(state):
+    globals().update(state)
+
+
+def step_simulation():
+    # Advance the match by exactly one tick; safe to call headlessly for fast-forward
+    telemetry.count("ticks_simulated")
+    for event, payload in scheduler.advance():
+        handle_game_event(event, payload)
+
+
+def simulate_match():
+    # Fast-forward the current match to its end without drawing anything
+    while not match_over:
+        step_simulation()
+
+
+# Binary match snapshots. Layout (little-endian):
+#   header, then per-section counts followed by fixed-size records,
+#   then the board at 2 bits per cell and the gameplay and AI RNG states.
+SNAPSHOT_MAGIC = b"TGS2"
+SNAPSHOT_HEADER = struct.Struct("<4sHBBII")  # magic, grid size, mode, difficulty, tick, scheduler seq
+SNAPSHOT_PLAYERS = struct.Struct("<iiHHHHII") # scores, positions, frozen_until (blue then green)
+SNAPSHOT_COUNT = struct.Struct("<H")
+SNAPSHOT_EVENT = struct.Struct("<IIBB")       # tick, seq, event, agent code
+SNAPSHOT_POWER_UP = struct.Struct("<HHB")     # x, y, type
+SNAPSHOT_RNG = struct.Struct("<B625Id")       # version, Mersenne Twister state, gauss_next (NaN = none)
+DIFFICULTIES = ("normal", "hard")
+AGENT_CODES = {None: 0, "blue": 1, "green": 2}
+CELL_OWNERS = (None, "blue", "green", None)
+# Byte -> the four cell owners it packs, so unpacking is one lookup per byte
+BOARD_UNPACK_TABLE = [tuple(CELL_OWNERS[(packed >> shift) & 3] for shift in (0, 2, 4, 6)) for packed in range(256)]
+SAVE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "savegame.bin")
+
+
+def pack_board(board_to_pack):
+    codes = [AGENT_CODES[cell] for column in board_to_pack for cell in column]
+    codes += [0] * (-len(codes) % 4)
+    return bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(codes[0::4], codes[1::4], codes[2::4], codes[3::4]))
+
+
+def unpack_board(data, grid_size):
+    cells = list(chain.from_iterable(BOARD_UNPACK_TABLE[packed] for packed in data))
+    return [cells[x * grid_size:(x + 1) * grid_size] for x in range(grid_size)]
+
+
+def encode_snapshot():
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, GRID_SIZE, game_mode.value, DIFFICULTIES.index(difficulty),
+                                  scheduler.now, scheduler.seq),
+             SNAPSHOT_PLAYERS.pack(scores["blue"], scores["green"],
+                                   *player_positions["blue"], *player_positions["green"],
+                                   frozen_until["blue"], frozen_until["green"])]
+
+    # Pending events carry the remaining match time, respawns and freeze expiries
+    parts.append(SNAPSHOT_COUNT.pack(len(scheduler.queue)))
+    parts += [SNAPSHOT_EVENT.pack(tick, seq, event.value, AGENT_CODES[payload])
+              for tick, seq, event, payload in scheduler.queue]
+    parts.append(SNAPSHOT_COUNT.pack(len(power_ups)))
+    parts += [SNAPSHOT_POWER_UP.pack(x, y, p_type.value) for x, y, p_type in power_ups]
+    parts.append(pack_board(board))
+
+    for stream in (rng.gameplay, rng.ai):
+        rng_version, rng_state, gauss_next = stream.getstate()
+        parts.append(SNAPSHOT_RNG.pack(rng_version, *rng_state, math.nan if gauss_next is None else gauss_next))
+    return b"".join(parts)
+
+
+def decode_snapshot(data):
+    global board, scores, player_positions, power_ups, frozen_until, match_over, scheduler, game_mode, difficulty
+
+    magic, grid_size, mode_value, difficulty_index, now, seq = SNAPSHOT_HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or grid_size != GRID_SIZE:
+        raise ValueError("snapshot is from a different game version or grid size")
+    offset = SNAPSHOT_HEADER.size
+    blue_score, green_score, blue_x, blue_y, green_x, green_y, blue_frozen, green_frozen = \
+        SNAPSHOT_PLAYERS.unpack_from(data, offset)
+    offset += SNAPSHOT_PLAYERS.size
+
+    (event_count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+    offset += SNAPSHOT_COUNT.size
+    queue = []
+    for tick, event_seq, event_value, agent_code in SNAPSHOT_EVENT.iter_unpack(data[offset:offset + event_count * SNAPSHOT_EVENT.size]):
+        queue.append((tick, event_seq, GameEvent(event_value), CELL_OWNERS[agent_code]))
+    offset += event_count * SNAPSHOT_EVENT.size
+
+    (power_up_count,) = SNAPSHOT_COUNT.unpack_from(data, offset)
+    offset += SNAPSHOT_COUNT.size
+    restored_power_ups = [(x, y, PowerUpType(type_value)) for x, y, type_value in
+                          SNAPSHOT_POWER_UP.iter_unpack(data[offset:offset + power_up_count * SNAPSHOT_POWER_UP.size])]
+    offset += power_up_count * SNAPSHOT_POWER_UP.size
+
+    board_bytes = (grid_size * grid_size + 3) // 4
+    restored_board = unpack_board(data[offset:offset + board_bytes], grid_size)
+    offset += board_bytes
+
+    for stream in (rng.gameplay, rng.ai):
+        rng_values = SNAPSHOT_RNG.unpack_from(data, offset)
+        offset += SNAPSHOT_RNG.size
+        gauss_next = rng_values[-1]
+        stream.setstate((rng_values[0], tuple(rng_values[1:-1]), None if math.isnan(gauss_next) else gauss_next))
+
+    board = restored_board
+    scores = {"blue": blue_score, "green": green_score}
+    player_positions = {"blue": (blue_x, blue_y), "green": (green_x, green_y)}
+    power_ups = restored_power_ups
+    frozen_until = {"blue": blue_frozen, "green": green_frozen}
+    match_over = False
+    scheduler = EventScheduler()
+    scheduler.now = now
+    scheduler.seq = seq
+    scheduler.queue = queue
+    heapq.heapify(scheduler.queue)
+    game_mode = GameMode(mode_value)
+    difficulty = DIFFICULTIES[difficulty_index]
+
+
+def save_snapshot(path=SAVE_FILE):
+    # Write to a temp file first so a crash mid-save can't corrupt the old save
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(encode_snapshot())
+    os.replace(temp_path, path)
+
+
+def load_snapshot(path=SAVE_FILE):
+    with open(path, "rb") as snapshot_file:
+        decode_snapshot(snapshot_file.read())
+
+
+# Pre-rendered screen layers, built the first time each screen is shown
+ui_layers = {}
+
+
+def draw_bubble_background(surface, count, mixed_fill):
+    surface.fill(PINK_LIGHT)
+    for _ in range(count):
+        x_bg = rng.cosmetic.randint(0, WIDTH)
+        y_bg = rng.cosmetic.randint(0, HEIGHT)
+        size = rng.cosmetic.randint(5, 15)
+        # Simple circles for "cute" background; 0 for filled, 1 for outline
+        pygame.draw.circle(surface, PINK_MEDIUM, (x_bg, y_bg), size, rng.cosmetic.randint(0, 1) if mixed_fill else 1)
+
+
+def draw_hearts_and_stars_background(surface, count):
+    surface.fill(PINK_LIGHT)
+    for _ in range(count):
+        x_bg = rng.cosmetic.randint(0, WIDTH)
+        y_bg = rng.cosmetic.randint(0, HEIGHT)
+        if rng.cosmetic.random() < 0.7:
+            size = rng.cosmetic.randint(5, 10)
+            pygame.draw.circle(surface, PINK_MEDIUM, (x_bg - size//2, y_bg - size//2), size//2 +1)
+            pygame.draw.circle(surface, PINK_MEDIUM, (x_bg + size//2, y_bg - size//2), size//2 +1)
+            pygame.draw.polygon(surface, PINK_MEDIUM, [(x_bg-size, y_bg - size//3),(x_bg+size,y_bg - size//3),(x_bg,y_bg+size*1.2)])
+        else:
+            size = rng.cosmetic.randint(8, 15)
+            star_points = []
+            for j_star in range(5):
+                angle = j_star * 2 * math.pi / 5 - math.pi / 2
+                star_points.append((x_bg + math.cos(angle) * size, y_bg + math.sin(angle) * size))
+                angle += math.pi / 5
+                inner_size = size * 0.4
+                star_points.append((x_bg + math.cos(angle) * inner_size, y_bg + math.sin(angle) * inner_size))
+            pygame.draw.polygon(surface, PASTEL_YELLOW, star_points)
+
+
+def get_background_layer(name):
+    if name not in ui_layers:
+        layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+        if name == "menu":
+            draw_bubble_background(layer, 50, True)
+        elif name == "select": # Shared by mode and difficulty select
+            draw_bubble_background(layer, 30, False)
+        elif name == "game_over":
+            draw_bubble_background(layer, 50, False)
+        elif name == "customization":
+            draw_hearts_and_stars_background(layer, 30)
+        ui_layers[name] = layer
+    return ui_layers[name]
+
+
+def draw_button(surface, text, center, padding):
+    # Returns the button background rect for hit testing
+    button_surface = MENU_FONT.render(text, True, BLACK)
+    button_rect = button_surface.get_rect(center=center)
+    button_bg = button_rect.inflate(*padding)
+    pygame.draw.rect(surface, PINK_MEDIUM, button_bg, border_radius=10)
+    pygame.draw.rect(surface, HOT_PINK, button_bg, 3, border_radius=10)
+    surface.blit(button_surface, button_rect)
+    return button_bg
+
+
+def draw_title(surface, text, y_pos):
+    title_surface = TITLE_FONT.render(text, True, HOT_PINK)
+    surface.blit(title_surface, title_surface.get_rect(center=(WIDTH//2, y_pos)))
+
+
+def game_over_screen():
     if scores["blue"] > scores["green"]:
         winner = "Blue"
         winner_color = custom_player_colors["blue"]
@@ -362,44 +765,27 @@ def game_over_screen():
         winner = "Tie"
         winner_color = BLACK
 
-    for i in range(50):
-        x_bg = random.randint(0, WIDTH)
-        y_bg = random.randint(0, HEIGHT)
-        size = random.randint(5, 15)
-        pygame.draw.circle(screen, PINK_MEDIUM, (x_bg, y_bg), size, 1)
-
-    winner_text_str = f"{winner} Wins!" if winner != "Tie" else "It's a Tie!"
-    winner_surface = TITLE_FONT.render(winner_text_str, True, winner_color)
-
-    pulse = math.sin(pygame.time.get_ticks() * 0.003) * 10
-    winner_rect = winner_surface.get_rect(center=(WIDTH//2, HEIGHT//2 - 50 + pulse))
-    screen.blit(winner_surface, winner_rect)
+    # Everything except the pulsing winner text is fixed for this screen, so draw it once
+    static_layer = get_background_layer("game_over").copy()
 
     scores_text = f"Blue: {scores['blue']}  Green: {scores['green']}"
     scores_surface = MENU_FONT.render(scores_text, True, BLACK)
-    scores_rect = scores_surface.get_rect(center=(WIDTH//2, HEIGHT//2 + 50))
-    screen.blit(scores_surface, scores_rect)
-
-    again_text = "Play Again (Enter)"
-    again_surface = MENU_FONT.render(again_text, True, BLACK)
-    again_button_rect = again_surface.get_rect(center=(WIDTH//2, HEIGHT//2 + 120))
-    again_button_bg = again_button_rect.inflate(40, 20)
-    pygame.draw.rect(screen, PINK_MEDIUM, again_button_bg, border_radius=10)
-    pygame.draw.rect(screen, HOT_PINK, again_button_bg, 3, border_radius=10)
-    screen.blit(again_surface, again_button_rect)
-
-    menu_text = "Main Menu (Esc)"
-    menu_surface = MENU_FONT.render(menu_text, True, BLACK)
-    menu_button_rect = menu_surface.get_rect(center=(WIDTH//2, HEIGHT//2 + 180))
-    menu_button_bg = menu_button_rect.inflate(40, 20)
-    pygame.draw.rect(screen, PINK_MEDIUM, menu_button_bg, border_radius=10)
-    pygame.draw.rect(screen, HOT_PINK, menu_button_bg, 3, border_radius=10)
-    screen.blit(menu_surface, menu_button_rect)
+    static_layer.blit(scores_surface, scores_surface.get_rect(center=(WIDTH//2, HEIGHT//2 + 50)))
 
-    pygame.display.flip()
+    again_button_bg = draw_button(static_layer, "Play Again (Enter)", (WIDTH//2, HEIGHT//2 + 120), (40, 20))
+    menu_button_bg = draw_button(static_layer, "Main Menu (Esc)", (WIDTH//2, HEIGHT//2 + 180), (40, 20))
+
+    winner_text_str = f"{winner} Wins!" if winner != "Tie" else "It's a Tie!"
+    winner_surface = TITLE_FONT.render(winner_text_str, True, winner_color)
 
     waiting = True
     while waiting:
+        screen.blit(static_layer, (0, 0))
+        pulse = math.sin(pygame.time.get_ticks() * 0.003) * 10
+        screen.blit(winner_surface, winner_surface.get_rect(center=(WIDTH//2, HEIGHT//2 - 50 + pulse)))
+        pygame.display.flip()
+        clock.tick(60)
+
         for event_go in pygame.event.get():
             if event_go.type == pygame.QUIT:
                 pygame.quit()
@@ -417,44 +803,33 @@ def game_over_screen():
                     return GameState.MENU
     return GameState.MENU 
 
-def draw_menu():
-    screen.fill(PINK_LIGHT)
-    button_rects_menu = [] 
-
-    for _ in range(50):
-        x_bg = random.randint(0, WIDTH)
-        y_bg = random.randint(0, HEIGHT)
-        size = random.randint(5, 15)
-        
-        # Simple circles for "cute" animated background
-        # Using a temporary surface for alpha effect if desired, but simpler is often better for menus
-        pygame.draw.circle(screen, PINK_MEDIUM, (x_bg,y_bg),size, random.randint(0,1)) # 0 for filled, 1 for outline
 
+def build_menu_layer():
+    layer = get_background_layer("menu").copy()
 
     title_text_str = "Cute Territory Game"
-    title_surface = TITLE_FONT.render(title_text_str, True, HOT_PINK)
-    title_rect = title_surface.get_rect(center=(WIDTH//2, 100))
-
     shadow_surface = TITLE_FONT.render(title_text_str, True, PINK_DARK)
-    shadow_rect = shadow_surface.get_rect(center=(WIDTH//2 + 4, 104))
-    screen.blit(shadow_surface, shadow_rect)
-    screen.blit(title_surface, title_rect)
+    layer.blit(shadow_surface, shadow_surface.get_rect(center=(WIDTH//2 + 4, 104)))
+    draw_title(layer, title_text_str, 100)
 
     buttons_data = [
         ("Play", 200, GameState.MODE_SELECT),
         ("Customize", 270, GameState.CUSTOMIZATION),
         ("Quit", 340, None) 
     ]
-
+    button_rects_menu = []
     for text, y_pos, next_state in buttons_data:
-        button_surface = MENU_FONT.render(text, True, BLACK)
-        button_rect = button_surface.get_rect(center=(WIDTH//2, y_pos))
-        button_bg = button_rect.inflate(80, 20)
-        pygame.draw.rect(screen, PINK_MEDIUM, button_bg, border_radius=10)
-        pygame.draw.rect(screen, HOT_PINK, button_bg, 3, border_radius=10)
-        screen.blit(button_surface, button_rect)
+        button_bg = draw_button(layer, text, (WIDTH//2, y_pos), (80, 20))
         button_rects_menu.append((button_bg, next_state, text)) 
+    return layer, button_rects_menu
+
 
+def draw_menu():
+    global resume_requested
+    if "menu_ui" not in ui_layers:
+        ui_layers["menu_ui"] = build_menu_layer()
+    layer, button_rects_menu = ui_layers["menu_ui"]
+    screen.blit(layer, (0, 0))
     pygame.display.flip()
 
     waiting = True
@@ -466,6 +841,9 @@ def draw_menu():
             elif event_menu.type == pygame.KEYDOWN:
                 if event_menu.key == pygame.K_RETURN: 
                     return GameState.MODE_SELECT
+                elif event_menu.key == pygame.K_F9 and os.path.exists(SAVE_FILE): # Resume saved match
+                    resume_requested = True
+                    return GameState.PLAYING
                 elif event_menu.key == pygame.K_ESCAPE:
                     pygame.quit()
                     sys.exit()
@@ -479,43 +857,29 @@ def draw_menu():
                         return next_st
     return GameState.MENU 
 
-def draw_mode_select():
-    screen.fill(PINK_LIGHT)
-    mode_button_rects = []
-
-    for _ in range(30):
-        x_bg = random.randint(0, WIDTH)
-        y_bg = random.randint(0, HEIGHT)
-        size = random.randint(5, 15)
-        pygame.draw.circle(screen, PINK_MEDIUM, (x_bg, y_bg), size, 1)
-
-    title_text_str = "Select Game Mode"
-    title_surface = TITLE_FONT.render(title_text_str, True, HOT_PINK)
-    title_rect = title_surface.get_rect(center=(WIDTH//2, 100))
-    screen.blit(title_surface, title_rect)
-
-    modes_data = [
-        ("Human vs AI", GameMode.HUMAN_VS_AI, 200),
-        ("AI vs AI", GameMode.AI_VS_AI, 270)
-    ]
 
-    for text, mode_val, y_pos in modes_data:
-        mode_surface = MENU_FONT.render(text, True, BLACK)
-        mode_rect = mode_surface.get_rect(center=(WIDTH//2, y_pos))
-        button_bg = mode_rect.inflate(150, 20)
-        pygame.draw.rect(screen, PINK_MEDIUM, button_bg, border_radius=10)
-        pygame.draw.rect(screen, HOT_PINK, button_bg, 3, border_radius=10)
-        screen.blit(mode_surface, mode_rect)
-        mode_button_rects.append((button_bg, mode_val))
-
-    back_text_str = "Back"
-    back_surface = MENU_FONT.render(back_text_str, True, BLACK)
-    back_rect_btn = back_surface.get_rect(center=(WIDTH//2, 340))
-    back_bg_btn = back_rect_btn.inflate(80, 20)
-    pygame.draw.rect(screen, PINK_MEDIUM, back_bg_btn, border_radius=10)
-    pygame.draw.rect(screen, HOT_PINK, back_bg_btn, 3, border_radius=10)
-    screen.blit(back_surface, back_rect_btn)
+def build_select_layer(title_text_str, options_data, option_padding):
+    # Title, one button per option and a Back button over the shared select background
+    layer = get_background_layer("select").copy()
+    draw_title(layer, title_text_str, 100)
+
+    option_rects = []
+    for text, value, y_pos in options_data:
+        button_bg = draw_button(layer, text, (WIDTH//2, y_pos), option_padding)
+        option_rects.append((button_bg, value))
+    back_bg_btn = draw_button(layer, "Back", (WIDTH//2, 340), (80, 20))
+    return layer, option_rects, back_bg_btn
+
 
+def draw_mode_select():
+    if "mode_select_ui" not in ui_layers:
+        modes_data = [
+            ("Human vs AI", GameMode.HUMAN_VS_AI, 200),
+            ("AI vs AI", GameMode.AI_VS_AI, 270)
+        ]
+        ui_layers["mode_select_ui"] = build_select_layer("Select Game Mode", modes_data, (150, 20))
+    layer, mode_button_rects, back_bg_btn = ui_layers["mode_select_ui"]
+    screen.blit(layer, (0, 0))
     pygame.display.flip()
 
     waiting = True
@@ -537,43 +901,16 @@ def draw_mode_select():
                     return GameState.MENU, game_mode 
     return GameState.MENU, game_mode
 
-def draw_difficulty_select():
-    screen.fill(PINK_LIGHT)
-    diff_button_rects = []
-
-    for _ in range(30):
-        x_bg = random.randint(0, WIDTH)
-        y_bg = random.randint(0, HEIGHT)
-        size = random.randint(5, 15)
-        pygame.draw.circle(screen, PINK_MEDIUM, (x_bg, y_bg), size, 1)
-
-    title_text_str = "Select Difficulty"
-    title_surface = TITLE_FONT.render(title_text_str, True, HOT_PINK)
-    title_rect = title_surface.get_rect(center=(WIDTH//2, 100))
-    screen.blit(title_surface, title_rect)
-
-    difficulties_data = [
-        ("Normal", "normal", 200),
-        ("Hard", "hard", 270)
-    ]
-
-    for text, diff_val, y_pos in difficulties_data:
-        diff_surface = MENU_FONT.render(text, True, BLACK)
-        diff_rect = diff_surface.get_rect(center=(WIDTH//2, y_pos))
-        button_bg = diff_rect.inflate(100, 20)
-        pygame.draw.rect(screen, PINK_MEDIUM, button_bg, border_radius=10)
-        pygame.draw.rect(screen, HOT_PINK, button_bg, 3, border_radius=10)
-        screen.blit(diff_surface, diff_rect)
-        diff_button_rects.append((button_bg, diff_val))
-
-    back_text_str = "Back"
-    back_surface = MENU_FONT.render(back_text_str, True, BLACK)
-    back_rect_btn = back_surface.get_rect(center=(WIDTH//2, 340))
-    back_bg_btn = back_rect_btn.inflate(80, 20)
-    pygame.draw.rect(screen, PINK_MEDIUM, back_bg_btn, border_radius=10)
-    pygame.draw.rect(screen, HOT_PINK, back_bg_btn, 3, border_radius=10)
-    screen.blit(back_surface, back_rect_btn)
 
+def draw_difficulty_select():
+    if "difficulty_select_ui" not in ui_layers:
+        difficulties_data = [
+            ("Normal", "normal", 200),
+            ("Hard", "hard", 270)
+        ]
+        ui_layers["difficulty_select_ui"] = build_select_layer("Select Difficulty", difficulties_data, (100, 20))
+    layer, diff_button_rects, back_bg_btn = ui_layers["difficulty_select_ui"]
+    screen.blit(layer, (0, 0))
     pygame.display.flip()
     
     waiting = True
@@ -597,9 +934,44 @@ def draw_difficulty_select():
     return GameState.MODE_SELECT, difficulty
 
 
+def build_customization_layer():
+    # Everything on the customization screen except selection outlines and preview circles
+    layer = get_background_layer("customization").copy()
+    draw_title(layer, "Customize Your Game", 70)
+
+    section_surface = MENU_FONT.render("Player Colors", True, PINK_DARK)
+    layer.blit(section_surface, section_surface.get_rect(center=(WIDTH//2, 140)))
+
+    blue_text_surf = GAME_FONT.render("Blue Player", True, BLACK)
+    layer.blit(blue_text_surf, blue_text_surf.get_rect(topleft=(WIDTH//4 - 80, 180))) # Adjusted position
+    green_text_surf = GAME_FONT.render("Green Player", True, BLACK)
+    layer.blit(green_text_surf, green_text_surf.get_rect(topleft=(WIDTH*3//4 - 100, 180))) # Adjusted position
+
+    blue_color_option_rects = []
+    green_color_option_rects = []
+    for i, color_opt in enumerate(available_colors):
+        blue_rect_shape = pygame.Rect(WIDTH//4 - 70 + i * 45, 210, 30, 30) # Spaced out
+        green_rect_shape = pygame.Rect(WIDTH*3//4 - 90 + i * 45, 210, 30, 30)
+        pygame.draw.rect(layer, color_opt, blue_rect_shape, border_radius=5)
+        pygame.draw.rect(layer, color_opt, green_rect_shape, border_radius=5)
+        blue_color_option_rects.append((blue_rect_shape, color_opt))
+        green_color_option_rects.append((green_rect_shape, color_opt))
+
+    preview_text_surf = MENU_FONT.render("Preview", True, PINK_DARK)
+    layer.blit(preview_text_surf, preview_text_surf.get_rect(center=(WIDTH//2, 290)))
+    layer.blit(blue_text_surf, blue_text_surf.get_rect(center=(WIDTH//3, 400)))
+    layer.blit(green_text_surf, green_text_surf.get_rect(center=(WIDTH*2//3, 400)))
+
+    back_bg_btn = draw_button(layer, "Save & Back", (WIDTH//2, HEIGHT - 60), (40, 20))
+    return layer, blue_color_option_rects, green_color_option_rects, back_bg_btn
+
+
 def draw_customization():
-    screen.fill(PINK_LIGHT)
     global custom_player_colors 
+
+    if "customization_ui" not in ui_layers:
+        ui_layers["customization_ui"] = build_customization_layer()
+    layer, blue_color_option_rects, green_color_option_rects, back_bg_btn = ui_layers["customization_ui"]
     
     # Work with copies for live preview until saved
     temp_blue_color = custom_player_colors["blue"]
@@ -607,84 +979,19 @@ def draw_customization():
     
     running_customization = True
     while running_customization: # Loop to allow screen updates within the function
-        screen.fill(PINK_LIGHT) # Redraw background each frame
-
-        for _ in range(30):
-            x_bg = random.randint(0, WIDTH)
-            y_bg = random.randint(0, HEIGHT)
-            if random.random() < 0.7:
-                size = random.randint(5, 10)
-                pygame.draw.circle(screen, PINK_MEDIUM, (x_bg - size//2, y_bg - size//2), size//2 +1)
-                pygame.draw.circle(screen, PINK_MEDIUM, (x_bg + size//2, y_bg - size//2), size//2 +1)
-                pygame.draw.polygon(screen, PINK_MEDIUM, [(x_bg-size, y_bg - size//3),(x_bg+size,y_bg - size//3),(x_bg,y_bg+size*1.2)])
-            else:
-                size = random.randint(8, 15)
-                star_points = []
-                for j_star in range(5):
-                    angle = j_star * 2 * math.pi / 5 - math.pi / 2
-                    star_points.append((x_bg + math.cos(angle) * size, y_bg + math.sin(angle) * size))
-                    angle += math.pi / 5
-                    inner_size = size * 0.4
-                    star_points.append((x_bg + math.cos(angle) * inner_size, y_bg + math.sin(angle) * inner_size))
-                pygame.draw.polygon(screen, PASTEL_YELLOW, star_points)
-
-        title_text_str = "Customize Your Game"
-        title_surface = TITLE_FONT.render(title_text_str, True, HOT_PINK)
-        title_rect = title_surface.get_rect(center=(WIDTH//2, 70))
-        screen.blit(title_surface, title_rect)
-
-        section_text_str = "Player Colors"
-        section_surface = MENU_FONT.render(section_text_str, True, PINK_DARK)
-        section_rect = section_surface.get_rect(center=(WIDTH//2, 140))
-        screen.blit(section_surface, section_rect)
-
-        blue_text_surf = GAME_FONT.render("Blue Player", True, BLACK)
-        blue_text_rect = blue_text_surf.get_rect(topleft=(WIDTH//4 - 80, 180)) # Adjusted position
-        screen.blit(blue_text_surf, blue_text_rect)
-
-        blue_color_option_rects = []
-        for i, color_opt in enumerate(available_colors):
-            color_rect_shape = pygame.Rect(WIDTH//4 - 70 + i * 45, 210, 30, 30) # Spaced out
-            pygame.draw.rect(screen, color_opt, color_rect_shape, border_radius=5)
-            if color_opt == temp_blue_color:
-                pygame.draw.rect(screen, HOT_PINK, color_rect_shape, 3, border_radius=5)
-            blue_color_option_rects.append((color_rect_shape, color_opt))
-
-        green_text_surf = GAME_FONT.render("Green Player", True, BLACK)
-        green_text_rect = green_text_surf.get_rect(topleft=(WIDTH*3//4 - 100, 180)) # Adjusted position
-        screen.blit(green_text_surf, green_text_rect)
-
-        green_color_option_rects = []
-        for i, color_opt in enumerate(available_colors):
-            color_rect_shape = pygame.Rect(WIDTH*3//4 - 90 + i * 45, 210, 30, 30) # Spaced out
-            pygame.draw.rect(screen, color_opt, color_rect_shape, border_radius=5)
-            if color_opt == temp_green_color:
-                pygame.draw.rect(screen, HOT_PINK, color_rect_shape, 3, border_radius=5)
-            green_color_option_rects.append((color_rect_shape, color_opt))
-
-        preview_text_surf = MENU_FONT.render("Preview", True, PINK_DARK)
-        preview_rect = preview_text_surf.get_rect(center=(WIDTH//2, 290))
-        screen.blit(preview_text_surf, preview_rect)
-
-        blue_preview_center_pos = (WIDTH//3, 350)
-        green_preview_center_pos = (WIDTH*2//3, 350)
-        pygame.draw.circle(screen, temp_blue_color, blue_preview_center_pos, 30)
-        pygame.draw.circle(screen, temp_green_color, green_preview_center_pos, 30)
-
-        blue_prev_text_surf = GAME_FONT.render("Blue Player", True, BLACK)
-        green_prev_text_surf = GAME_FONT.render("Green Player", True, BLACK)
-        screen.blit(blue_prev_text_surf, blue_prev_text_surf.get_rect(center=(WIDTH//3, 400)))
-        screen.blit(green_prev_text_surf, green_prev_text_surf.get_rect(center=(WIDTH*2//3, 400)))
-
-        back_text_str = "Save & Back"
-        back_surface = MENU_FONT.render(back_text_str, True, BLACK)
-        back_rect_btn = back_surface.get_rect(center=(WIDTH//2, HEIGHT - 60)) 
-        back_bg_btn = back_rect_btn.inflate(40, 20)
-        pygame.draw.rect(screen, PINK_MEDIUM, back_bg_btn, border_radius=10)
-        pygame.draw.rect(screen, HOT_PINK, back_bg_btn, 3, border_radius=10)
-        screen.blit(back_surface, back_rect_btn)
+        screen.blit(layer, (0, 0))
+
+        for option_rects, selected_color in ((blue_color_option_rects, temp_blue_color),
+                                             (green_color_option_rects, temp_green_color)):
+            for color_rect_shape, color_opt in option_rects:
+                if color_opt == selected_color:
+                    pygame.draw.rect(screen, HOT_PINK, color_rect_shape, 3, border_radius=5)
+
+        pygame.draw.circle(screen, temp_blue_color, (WIDTH//3, 350), 30)
+        pygame.draw.circle(screen, temp_green_color, (WIDTH*2//3, 350), 30)
 
         pygame.display.flip() # Update the full display
+        clock.tick(60)
 
         for event_cust in pygame.event.get():
             if event_cust.type == pygame.QUIT:
@@ -721,29 +1028,36 @@ def draw_customization():
     return GameState.MENU
 
 
-def reset_game():
-    global board, scores, player_positions, power_ups, frozen_until
+def reset_game(seed=None):
+    global board, scores, player_positions, power_ups, frozen_until, match_over, scheduler
 
     board = [[None for _ in range(GRID_SIZE)] for _ in range(GRID_SIZE)]
     scores = {"blue": 0, "green": 0}
     player_positions = {"blue": (1, 1), "green": (GRID_SIZE-2, GRID_SIZE-2)}
     power_ups = []
     frozen_until = {"blue": 0, "green": 0}
+    match_over = False
+    scheduler = EventScheduler()
+    rng.seed_match(seed) # None draws the next match seed from the session
 
     board[player_positions["blue"][0]][player_positions["blue"][1]] = "blue"
     board[player_positions["green"][0]][player_positions["green"][1]] = "green"
     scores["blue"] = 1
     scores["green"] = 1
 
-    for _ in range(random.randint(2,3)): 
+    for _ in range(rng.gameplay.randint(2,3)): 
         spawn_power_up()
-    
-    # Clear any pending power-up spawn timers
-    pygame.time.set_timer(pygame.USEREVENT + 1, 0)
+
+    # Everything timed in the match runs off the scheduler from here on
+    scheduler.schedule(POWER_UP_SPAWN_INTERVAL * SIM_TICKS_PER_SECOND, GameEvent.PERIODIC_SPAWN)
+    scheduler.schedule(TIME_LIMIT * SIM_TICKS_PER_SECOND, GameEvent.MATCH_END)
+    if game_mode == GameMode.AI_VS_AI:
+        scheduler.schedule(ai_move_delay_ticks("blue"), GameEvent.AI_MOVE, "blue")
+    scheduler.schedule(ai_move_delay_ticks("green"), GameEvent.AI_MOVE, "green")
 
 
 def game_loop():
-    global game_state, game_mode, difficulty
+    global game_state, game_mode, difficulty, resume_requested
 
     if has_music:
         try:
@@ -752,17 +1066,13 @@ def game_loop():
         except Exception as e:
             print(f"Error playing music: {e}")
 
-    ai_player_turn_timer = 0 
     start_time_playing_state = 0 
-    power_up_spawn_timer = pygame.time.get_ticks() # For periodic power-up spawn
+    sim_accumulator_ms = 0 # Real time not yet consumed by simulation ticks
+    input_press_times = [] # Key presses applied since the last flip, for latency
+    last_flip_at = time.perf_counter() # Presses read by the next poll were queued no earlier than about here
 
     running = True
     while running:
-        current_game_speed_divisor = HARD_SPEED if difficulty == "hard" else NORMAL_SPEED
-        # Frame delay for AI: higher value means slower AI, lower means faster
-        ai_move_delay_frames = int(60 / current_game_speed_divisor)
-
-
         if game_state == GameState.MENU:
             game_state = draw_menu()
             if has_music and not pygame.mixer.music.get_busy():
@@ -786,17 +1096,26 @@ def game_loop():
 
         elif game_state == GameState.PLAYING:
             if start_time_playing_state == 0: # First frame entering PLAYING state
-                 reset_game()
+                 if resume_requested:
+                     resume_requested = False
+                     try:
+                         load_snapshot()
+                     except Exception as e:
+                         print(f"Error loading saved match: {e}")
+                         reset_game()
+                 else:
+                     reset_game()
                  start_time_playing_state = pygame.time.get_ticks()
-                 ai_player_turn_timer = 0 # Reset AI timer
-                 power_up_spawn_timer = pygame.time.get_ticks() # Reset power-up spawn timer
-
+                 sim_accumulator_ms = 0
+                 human_input.clear()
+                 input_press_times.clear()
+                 clock.tick() # Don't count time spent in menus against the match
+                 last_flip_at = time.perf_counter()
 
-            elapsed_time_seconds = (pygame.time.get_ticks() - start_time_playing_state) // 1000
-            if elapsed_time_seconds >= TIME_LIMIT:
-                game_state = GameState.GAME_OVER
-                start_time_playing_state = 0 
-                continue 
+            # Each frame polls input, simulates, draws and only then waits on the
+            # frame limiter, so a key pressed during the wait is applied by the
+            # very next frame's simulation instead of sitting out another tick()
+            work_start = time.perf_counter()
 
             # --- Event Handling for PLAYING state ---
             for event in pygame.event.get():
@@ -804,43 +1123,75 @@ def game_loop():
                     running = False # Exit main loop
                 if event.type == pygame.KEYDOWN:
                     if game_mode == GameMode.HUMAN_VS_AI:
-                        if event.key in [pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT]:
-                            move_agent("blue", human_input=event.key) # Human moves immediately
+                        if event.key in DIRECTION_KEYS:
+                            # pygame doesn't say when SDL queued the press, so count from the last
+                            # flip: that includes any time it waited out the frame limiter's sleep
+                            human_input.key_down(event.key, scheduler.now, last_flip_at) # Applied on the next tick
                     if event.key == pygame.K_ESCAPE: 
                         game_state = GameState.MENU 
                         start_time_playing_state = 0 
                         if has_music: pygame.mixer.music.pause() # Pause music for menu
                         # No 'continue' here, let the loop transition normally to MENU state drawing
+                    elif event.key == pygame.K_F5: # Save and pause back to the menu
+                        try:
+                            save_snapshot()
+                            game_state = GameState.MENU
+                            start_time_playing_state = 0
+                            if has_music: pygame.mixer.music.pause()
+                        except Exception as e:
+                            print(f"Error saving match: {e}")
+                    elif event.key == pygame.K_F9 and os.path.exists(SAVE_FILE): # Resume the saved match
+                        resume_requested = True
+                        start_time_playing_state = 0
+                if event.type == pygame.KEYUP and event.key in DIRECTION_KEYS:
+                    human_input.key_up(event.key)
                 
-                if event.type == pygame.USEREVENT + 1: # Timer for spawning power-up
-                    spawn_power_up()
-                    pygame.time.set_timer(pygame.USEREVENT + 1, 0) # Clear the timer
+            if game_state != GameState.PLAYING:
+                continue
 
-
-            # --- AI Movement (if applicable) controlled by timer ---
-            ai_player_turn_timer += 1
-            if ai_player_turn_timer >= ai_move_delay_frames:
-                ai_player_turn_timer = 0
+            # --- Simulation: AI moves, spawns, freezes and match end all come from the scheduler ---
+            sim_steps = 0
+            while sim_accumulator_ms >= SIM_TICK_MS and sim_steps < MAX_SIM_STEPS_PER_FRAME:
                 if game_mode == GameMode.HUMAN_VS_AI:
-                    move_agent("green") # AI (Green) moves
-                elif game_mode == GameMode.AI_VS_AI:
-                    move_agent("blue")  # AI (Blue) moves
-                    move_agent("green") # AI (Green) moves
-            
-            # --- Periodic Power-up Spawning (alternative to event-based) ---
-            current_ticks = pygame.time.get_ticks()
-            if current_ticks - power_up_spawn_timer > 5000: # Spawn every 5 seconds
-                spawn_power_up()
-                power_up_spawn_timer = current_ticks
+                    human_move = human_input.next_move(scheduler.now)
+                    if human_move:
+                        move_key, pressed_at = human_move
+                        move_agent("blue", human_input=move_key)
+                        if pressed_at is not None:
+                            input_press_times.append(pressed_at)
+                step_simulation()
+                sim_accumulator_ms -= SIM_TICK_MS
+                sim_steps += 1
+                if match_over:
+                    break
+            if sim_steps == MAX_SIM_STEPS_PER_FRAME:
+                sim_accumulator_ms = 0 # Drop the backlog rather than spiral
 
+            if match_over:
+                game_state = GameState.GAME_OVER
+                start_time_playing_state = 0 
+                continue 
 
             # --- Drawing ---
+            elapsed_time_seconds = scheduler.now // SIM_TICKS_PER_SECOND
             screen.fill(PINK_LIGHT) # Clear screen or fill with background color
             draw_board() # Draws the grid, players, power-ups onto the screen
             draw_scores_and_timer(elapsed_time_seconds) # Draws the sidebar info
             
             pygame.display.flip()
-            clock.tick(60)
+            displayed_at = time.perf_counter()
+            telemetry.observe("frame_work", displayed_at - work_start) # Input, simulation and drawing only
+            for pressed_at in input_press_times:
+                telemetry.observe("input_latency", displayed_at - pressed_at)
+            input_press_times.clear()
+            last_flip_at = displayed_at
+
+            frame_ms = clock.tick(60)
+            while sim_accumulator_ms + frame_ms < SIM_TICK_MS: # tick(60) paces to 16 ms; top up so every frame gets a 16.7 ms tick
+                pygame.time.wait(1)
+                frame_ms += clock.tick()
+            telemetry.observe("frame", frame_ms / 1000) # Full interval, including the limiter's sleep
+            sim_accumulator_ms += frame_ms # Simulated by the next frame
 
         elif game_state == GameState.GAME_OVER:
             game_state = game_over_screen()
@@ -858,4 +1209,18 @@ def game_loop():
     sys.exit()
     
 if __name__ == '__main__':
-    game_loop()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cute Territory Game")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on 127.0.0.1:PORT/metrics")
+    parser.add_argument("--seed", type=int, help="session seed; the same seed replays the same sequence of matches")
+    parser.add_argument("--repeat-delay-ms", type=int, default=INPUT_REPEAT_DELAY_MS,
+                        help="hold time before an arrow key starts repeating")
+    parser.add_argument("--repeat-interval-ms", type=int, default=INPUT_REPEAT_INTERVAL_MS,
+                        help="time between repeated moves while an arrow key is held (0 disables)")
+    cli_args = parser.parse_args()
+    INPUT_REPEAT_DELAY_MS = cli_args.repeat_delay_ms
+    INPUT_REPEAT_INTERVAL_MS = cli_args.repeat_interval_ms
+    if cli_args.seed is not None:
+        rng = RngStreams(cli_args.seed)
+    if cli_args.metrics_port:
+        start_metrics_server(cli_args.metrics_port)
+    game_loop()
@@ -0,0 +1,107 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Matches are replayed headless in every worker process
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import game
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(game.__file__)), "replay_cache.json")
+
+
+def match_result(seed, difficulty, checkpoint_tick=None):
+    # Play one seeded AI_VS_AI match to the end. With checkpoint_tick the match
+    # is snapshotted and restored part-way, and the cosmetic stream is drawn
+    # from in between; neither may change the outcome. Both sides use the
+    # built-in profile, so a local ai_presets.json can't invalidate the baseline.
+    game.game_mode = game.GameMode.AI_VS_AI
+    game.difficulty = difficulty
+    game.ai_overrides = {agent: game.DEFAULT_AI_PROFILES[difficulty] for agent in ("blue", "green")}
+    game.reset_game(seed)
+    if checkpoint_tick is not None:
+        while game.scheduler.now < checkpoint_tick and not game.match_over:
+            game.step_simulation()
+        snapshot = game.encode_snapshot()
+        game.ui_layers.clear()
+        game.get_background_layer("customization")
+        game.decode_snapshot(snapshot)
+    game.simulate_match()
+    return {"board": hashlib.sha256(game.pack_board(game.board)).hexdigest(),
+            "scores": [game.scores["blue"], game.scores["green"]]}
+
+
+def replay_seeds(seeds, difficulty):
+    # Worker: returns {seed: (clean run, checkpointed run)}
+    checkpoint_tick = game.TIME_LIMIT * game.SIM_TICKS_PER_SECOND // 2
+    return {seed: (match_result(seed, difficulty), match_result(seed, difficulty, checkpoint_tick))
+            for seed in seeds}
+
+
+def parse_seeds(text):
+    # "500" -> 0..499, "100:200" -> 100..199
+    if ":" in text:
+        start, stop = text.split(":")
+        return list(range(int(start), int(stop)))
+    return list(range(int(text)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay seeded AI vs AI matches headlessly and check the final boards and scores are reproducible.")
+    parser.add_argument("--seeds", default="200", help="N for seeds 0..N-1, or START:STOP (default: 200)")
+    parser.add_argument("--difficulty", choices=["normal", "hard"], default="normal")
+    parser.add_argument("--cache", default=CACHE_FILE, help="baseline results to compare against")
+    parser.add_argument("--update", action="store_true", help="write these seeds' results into the baseline instead of comparing")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=25, help="seeds per worker task")
+    args = parser.parse_args()
+
+    seeds = parse_seeds(args.seeds)
+    cache = {}
+    if os.path.exists(args.cache):
+        with open(args.cache) as cache_file:
+            cache = json.load(cache_file)
+    known = cache.setdefault(args.difficulty, {})
+
+    start = time.time()
+    results = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(replay_seeds, seeds[i:i + args.chunk_size], args.difficulty)
+                   for i in range(0, len(seeds), args.chunk_size)]
+        for future in futures:
+            results.update(future.result())
+
+    failures = []
+    unchecked = 0
+    for seed in seeds:
+        clean, checkpointed = results[seed]
+        if clean != checkpointed:
+            failures.append(f"seed {seed}: replay differs in-process {clean} vs {checkpointed}")
+        elif args.update:
+            known[str(seed)] = clean
+        elif str(seed) not in known:
+            unchecked += 1
+        elif known[str(seed)] != clean:
+            failures.append(f"seed {seed}: expected {known[str(seed)]}, got {clean}")
+
+    # The baseline is committed, so it only changes when asked to
+    if args.update and not failures:
+        with open(args.cache, "w") as cache_file:
+            json.dump(cache, cache_file, indent=0, sort_keys=True)
+
+    for failure in failures[:20]:
+        print(failure)
+    if unchecked:
+        print(f"{unchecked} seeds are not in {args.cache}; only their in-process replays were checked")
+    print(f"{len(seeds) - len(failures)}/{len(seeds)} seeds reproduced ({args.difficulty}) in {time.time() - start:.1f}s")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
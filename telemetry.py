@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource # Not available on Windows
+except ImportError:
+    resource = None
+
+SAMPLE_WINDOW = 1000 # Most recent samples kept for quantiles
+QUANTILES = (0.5, 0.9, 0.99)
+
+COUNTER_HELP = {
+    "ticks_simulated": "Simulation ticks advanced.",
+    "power_ups_spawned": "Power-ups placed on the board.",
+    "power_ups_collected": "Power-ups picked up by a player.",
+    "power_up_spawn_failures": "spawn_power_up calls that found no free cell.",
+    "matches_played": "Matches that ran to the time limit.",
+}
+
+# Timings exported as summaries (territory_<name>_seconds)
+TIMING_HELP = {
+    "frame": "Time between rendered frames.",
+    "frame_work": "Time spent simulating and drawing a frame, excluding the frame limiter's sleep.",
+    "ai_decision": "Time spent choosing one AI move.",
+    "input_latency": "Time from a movement key press (anchored at the previous frame's flip) to the frame that shows the move.",
+}
+
+
+class Telemetry:
+    # Cheap counters and rolling timing samples updated from the game thread,
+    # read by the metrics server thread when scraped
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {name: 0 for name in COUNTER_HELP}
+        self.samples = {name: deque(maxlen=SAMPLE_WINDOW) for name in TIMING_HELP}
+        self.timing_totals = {name: 0.0 for name in TIMING_HELP}
+        self.timing_counts = {name: 0 for name in TIMING_HELP}
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def observe(self, name, seconds):
+        with self.lock:
+            self.samples[name].append(seconds)
+            self.timing_totals[name] += seconds
+            self.timing_counts[name] += 1
+
+    def render(self):
+        # Prometheus text exposition format
+        with self.lock:
+            samples = {name: sorted(window) for name, window in self.samples.items()}
+            timing_totals = dict(self.timing_totals)
+            timing_counts = dict(self.timing_counts)
+        counters = dict(self.counters)
+
+        lines = []
+        for name, help_text in COUNTER_HELP.items():
+            lines += [f"# HELP territory_{name}_total {help_text}",
+                      f"# TYPE territory_{name}_total counter",
+                      f"territory_{name}_total {counters[name]}"]
+
+        frame_samples = samples["frame"]
+        fps = len(frame_samples) / sum(frame_samples) if frame_samples and sum(frame_samples) > 0 else 0.0
+        lines += ["# HELP territory_fps Frames per second over the recent sample window.",
+                  "# TYPE territory_fps gauge",
+                  f"territory_fps {fps:.3f}"]
+
+        for name, help_text in TIMING_HELP.items():
+            lines += summary_lines(f"territory_{name}_seconds", help_text,
+                                   samples[name], timing_totals[name], timing_counts[name])
+
+        lines += ["# HELP territory_memory_rss_bytes Resident memory of the game process.",
+                  "# TYPE territory_memory_rss_bytes gauge",
+                  f"territory_memory_rss_bytes {current_rss_bytes()}",
+                  "# HELP territory_uptime_seconds Seconds since telemetry started.",
+                  "# TYPE territory_uptime_seconds gauge",
+                  f"territory_uptime_seconds {time.time() - self.started:.1f}"]
+        return "\n".join(lines) + "\n"
+
+
+def summary_lines(name, help_text, sorted_samples, total, count):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for quantile in QUANTILES:
+        value = sorted_samples[min(len(sorted_samples) - 1, int(quantile * len(sorted_samples)))] if sorted_samples else float("nan")
+        lines.append(f'{name}{{quantile="{quantile}"}} {value:.6f}')
+    lines += [f"{name}_sum {total:.6f}", f"{name}_count {count}"]
+    return lines
+
+
+def current_rss_bytes():
+    # /proc gives current RSS on Linux; elsewhere fall back to the peak
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024 # ru_maxrss is KiB on Linux
+
+
+telemetry = Telemetry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = telemetry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep scrapes out of the game's console
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    # Serve /metrics from a daemon thread so it never holds the game open
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,136 @@
+import os
+
+# game.py opens a window and the mixer on import; stay headless unless told otherwise
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import game
+
+# Cell ownership codes used in the board observation
+EMPTY, BLUE, GREEN = 0, 1, 2
+OWNER_CODES = {None: EMPTY, "blue": BLUE, "green": GREEN}
+AGENTS = ("blue", "green")
+
+# Action index -> key handed to move_agent (0 = stay put)
+ACTIONS = (None, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+
+
+def make_observation_buffers(batch_shape=()):
+    # One preallocated array per observation field. Environments write into
+    # these in place, so the arrays handed back from reset()/step() are the
+    # same objects every time - copy them if you need to keep a history.
+    grid = (game.GRID_SIZE, game.GRID_SIZE)
+    return {
+        "board": np.zeros(batch_shape + grid, dtype=np.int8),
+        "positions": np.zeros(batch_shape + (len(AGENTS), 2), dtype=np.int16),
+        "power_ups": np.zeros(batch_shape + (len(game.PowerUpType),) + grid, dtype=bool),
+        "frozen": np.zeros(batch_shape + (len(AGENTS),), dtype=np.float32), # Seconds of freeze left
+    }
+
+
+class TerritoryEnv:
+    # The learning agent plays blue against the built-in green AI. Each step
+    # applies one blue move, then runs the simulation up to green's next AI
+    # move, so both sides act at the difficulty's speed.
+    def __init__(self, difficulty="normal", buffers=None):
+        self.difficulty = difficulty
+        self.obs = buffers if buffers is not None else make_observation_buffers()
+        self.rng = game.RngStreams() # This env's own random streams
+        self.state = None
+        self.power_up_cells = [] # Cells currently set in obs["power_ups"]
+
+    def reset(self, seed=None):
+        # A seed restarts this env's match sequence; without one the next match seed follows on
+        if seed is not None:
+            self.rng = game.RngStreams(seed)
+        game.rng = self.rng
+        game.game_mode = game.GameMode.HUMAN_VS_AI
+        game.difficulty = self.difficulty
+        game.reset_game()
+        self.state = game.capture_match_state()
+
+        self.obs["board"].fill(EMPTY)
+        self.obs["power_ups"].fill(False)
+        self.power_up_cells = []
+        self._mark_positions()
+        self._sync_power_ups_and_freeze()
+        return self.obs, self._info()
+
+    def step(self, action):
+        game.restore_match_state(self.state)
+        margin_before = game.scores["blue"] - game.scores["green"]
+
+        if ACTIONS[action] is not None: # move_agent treats a missing key as an AI move
+            game.move_agent("blue", human_input=ACTIONS[action])
+            self._mark_positions()
+        for _ in range(game.ai_move_delay_ticks("green")):
+            game.step_simulation()
+            self._mark_positions()
+            if game.match_over:
+                break
+
+        self.state = game.capture_match_state()
+        self._sync_power_ups_and_freeze()
+        reward = (game.scores["blue"] - game.scores["green"]) - margin_before
+        return self.obs, float(reward), game.match_over, False, self._info()
+
+    def _mark_positions(self):
+        # A cell only changes owner when an agent steps onto it, so writing the
+        # agents' current cells after every tick keeps the board array exact
+        # without rescanning the list-of-lists board.
+        for i, agent in enumerate(AGENTS):
+            x, y = game.player_positions[agent]
+            self.obs["positions"][i] = (x, y)
+            self.obs["board"][x, y] = OWNER_CODES[game.board[x][y]]
+
+    def _sync_power_ups_and_freeze(self):
+        mask = self.obs["power_ups"]
+        for layer, x, y in self.power_up_cells:
+            mask[layer, x, y] = False
+        self.power_up_cells = [(p_type.value - 1, x, y) for x, y, p_type in game.power_ups]
+        for layer, x, y in self.power_up_cells:
+            mask[layer, x, y] = True
+
+        for i, agent in enumerate(AGENTS):
+            ticks_left = game.frozen_until[agent] - game.scheduler.now if game.frozen_until[agent] else 0
+            self.obs["frozen"][i] = ticks_left / game.SIM_TICKS_PER_SECOND
+
+    def _info(self):
+        return {"scores": dict(game.scores), "tick": game.scheduler.now}
+
+
+class VectorTerritoryEnv:
+    # Steps many TerritoryEnvs in lockstep. Each sub-env writes into its own
+    # slice of one batched buffer, so the batch observation is returned without
+    # stacking. Finished envs are reset straight away; the info for that step
+    # carries "final_scores" from the match that just ended.
+    def __init__(self, num_envs, difficulty="normal"):
+        self.obs = make_observation_buffers((num_envs,))
+        self.envs = [TerritoryEnv(difficulty, {name: buf[i] for name, buf in self.obs.items()})
+                     for i in range(num_envs)]
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+
+    def reset(self, seed=None):
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, info = env.reset(None if seed is None else seed + i)
+            infos.append(info)
+        return self.obs, infos
+
+    def step(self, actions):
+        infos = []
+        for i, env in enumerate(self.envs):
+            _, reward, done, _, info = env.step(int(actions[i]))
+            if done:
+                final_scores = info["scores"]
+                _, info = env.reset()
+                info["final_scores"] = final_scores
+            self.rewards[i] = reward
+            self.terminated[i] = done
+            infos.append(info)
+        return self.obs, self.rewards, self.terminated, self.truncated, infos
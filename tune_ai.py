@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Self-play runs headless in every worker process
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import game
+
+# Search space for AI profiles: (low, high, is_integer)
+PARAM_SPACE = {
+    "smartness": (0.3, 1.0, False),
+    "speed": (3, 15, True),
+    "steal_weight": (0.0, 3.0, False),
+    "frontier_weight": (0.0, 2.0, False),
+}
+
+# Stand-in for a human player: a fairly sensible AI moving at key-tapping pace
+HUMAN_PROXY = {"smartness": 0.8, "speed": 6, "steal_weight": 1.5, "frontier_weight": 0.5}
+
+# Target win rate of the human proxy against each difficulty
+DEFAULT_TARGETS = {"normal": 0.6, "hard": 0.3}
+
+# game.py picks presets up from its own directory
+GAME_DIR = os.path.dirname(os.path.abspath(game.__file__))
+CACHE_FILE = os.path.join(GAME_DIR, "ai_tuning_cache.json")
+PRESETS_FILE = os.path.join(GAME_DIR, "ai_presets.json")
+
+
+def cache_fingerprint():
+    # Cached outcomes are only valid for the rules and seed-to-match mapping they were played under
+    return json.dumps({
+        "rules_version": game.GAME_RULES_VERSION,
+        "time_limit": game.TIME_LIMIT,
+        "ticks_per_second": game.SIM_TICKS_PER_SECOND,
+        "grid_size": game.GRID_SIZE,
+        "freeze_duration": game.FREEZE_DURATION,
+        "points_bonus": game.POINTS_BONUS,
+        "respawn_delay": game.POWER_UP_RESPAWN_DELAY,
+        "spawn_interval": game.POWER_UP_SPAWN_INTERVAL,
+    }, sort_keys=True)
+
+
+def profile_key(profile):
+    return json.dumps(profile, sort_keys=True)
+
+
+def sample_profile(rng):
+    profile = {}
+    for name, (low, high, is_integer) in PARAM_SPACE.items():
+        profile[name] = rng.randint(low, high) if is_integer else round(rng.uniform(low, high), 2)
+    return profile
+
+
+def play_matches(proxy, candidate, seeds):
+    # Worker: proxy plays blue, candidate plays green; 1 = proxy win, 0.5 = tie
+    game.game_mode = game.GameMode.AI_VS_AI
+    game.ai_overrides = {"blue": proxy, "green": candidate}
+    outcomes = {}
+    for seed in seeds:
+        game.reset_game(seed)
+        game.simulate_match()
+        blue, green = game.scores["blue"], game.scores["green"]
+        outcomes[seed] = 1.0 if blue > green else 0.5 if blue == green else 0.0
+    return outcomes
+
+
+def load_cache(path):
+    # Returns the cached results, or an empty cache if they were made under different rules
+    if os.path.exists(path):
+        with open(path) as cache_file:
+            stored = json.load(cache_file)
+        if stored.get("fingerprint") == cache_fingerprint():
+            return stored["results"]
+        print(f"Ignoring {path}: it was written for different game rules")
+    return {}
+
+
+def save_cache(path, cache):
+    with open(path, "w") as cache_file:
+        json.dump({"fingerprint": cache_fingerprint(), "results": cache}, cache_file)
+
+
+def evaluate(pool, cache, proxy, candidates, seeds, chunk_size):
+    # Win rate of the proxy against each candidate over `seeds`, only simulating
+    # (candidate, seed) pairs that are not already cached
+    proxy_key = profile_key(proxy)
+    jobs = []
+    for candidate in candidates:
+        results = cache.setdefault(proxy_key, {}).setdefault(profile_key(candidate), {})
+        missing = [seed for seed in seeds if str(seed) not in results]
+        for start in range(0, len(missing), chunk_size):
+            jobs.append((results, pool.submit(play_matches, proxy, candidate, missing[start:start + chunk_size])))
+
+    for results, future in jobs:
+        results.update({str(seed): outcome for seed, outcome in future.result().items()})
+
+    win_rates = []
+    for candidate in candidates:
+        results = cache[proxy_key][profile_key(candidate)]
+        win_rates.append(sum(results[str(seed)] for seed in seeds) / len(seeds))
+    return win_rates
+
+
+def successive_halving(pool, cache, proxy, target, rng, args):
+    # Start wide with few games each, keep the half closest to the target win
+    # rate and double the games until one candidate is left
+    candidates = [sample_profile(rng) for _ in range(args.candidates)]
+    games = args.min_games
+    while True:
+        seeds = list(range(args.seed, args.seed + games))
+        win_rates = evaluate(pool, cache, proxy, candidates, seeds, args.chunk_size)
+        ranked = sorted(zip(candidates, win_rates), key=lambda pair: abs(pair[1] - target))
+        if len(ranked) == 1:
+            return ranked[0]
+        candidates = [candidate for candidate, _ in ranked[:max(1, len(ranked) // 2)]]
+        games *= 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune AI difficulty presets with seeded AI_VS_AI self-play.")
+    parser.add_argument("--candidates", type=int, default=32, help="profiles sampled per difficulty")
+    parser.add_argument("--min-games", type=int, default=8, help="games per candidate in the first round")
+    parser.add_argument("--seed", type=int, default=0, help="first match seed; also seeds the sampler")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=8, help="matches per worker task")
+    parser.add_argument("--target", action="append", default=[], metavar="DIFFICULTY=RATE",
+                        help="human-proxy win rate to aim for, e.g. hard=0.3 (repeatable)")
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--output", default=PRESETS_FILE)
+    args = parser.parse_args()
+
+    targets = dict(DEFAULT_TARGETS)
+    for item in args.target:
+        name, _, rate = item.partition("=")
+        try:
+            rate_value = float(rate)
+        except ValueError:
+            rate_value = None
+        if name not in DEFAULT_TARGETS or rate_value is None or not 0 <= rate_value <= 1:
+            parser.error(f"--target expects DIFFICULTY=RATE with DIFFICULTY one of "
+                         f"{', '.join(DEFAULT_TARGETS)} and RATE between 0 and 1, got {item!r}")
+        targets[name] = rate_value
+
+    cache = load_cache(args.cache)
+    rng = random.Random(args.seed)
+    presets = {}
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for name, target in targets.items():
+            profile, win_rate = successive_halving(pool, cache, HUMAN_PROXY, target, rng, args)
+            presets[name] = profile
+            print(f"{name}: proxy win rate {win_rate:.2f} (target {target:.2f}) -> {profile}")
+            save_cache(args.cache, cache)
+
+    with open(args.output, "w") as presets_file:
+        json.dump(presets, presets_file, indent=2)
+    print(f"Wrote {args.output} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()